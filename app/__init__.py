@@ -1,6 +1,7 @@
 from flask import Flask
 from app.routes.rotas_api import api_bp
 from app.routes.rotas_site import web_bp
+from app.services.historico import obter_historico
 
 def create_app():
     app = Flask(__name__)
@@ -8,4 +9,7 @@ def create_app():
     app.register_blueprint(api_bp, url_prefix="/api")
     app.register_blueprint(web_bp)
 
+    # Abre o banco do historico (CREATE TABLE/INDEX) antes da primeira requisicao.
+    obter_historico()
+
     return app
@@ -1,8 +1,14 @@
+import time
+
 from flask import Blueprint, request, jsonify
 
 from app.services.leitor_arquivo import arquivo_permitido, extrai_texto_do_upload
 from app.utils.Processa_texto import processaTextoDigitado
 from app.services.cliente_ia import classificar_email_e_sugerir_resposta
+from app.services.historico import registrar_classificacao
+from app.services.controle_admissao import SobrecargaError
+from app.services.cache_extracao import obter_cache_extracao, ler_upload_com_hash
+from app.services.conversas import obter_conversas
 
 api_bp = Blueprint("api", __name__)
 
@@ -21,14 +27,30 @@ def processa_email():
         if not arquivo_permitido(nome):
             return jsonify({"error": "Formato invalido. Use .txt ou .pdf"}), 400
 
-        texto_extraido = extrai_texto_do_upload(nome, arquivo.read())
+        conteudo, hash_conteudo = ler_upload_com_hash(arquivo.stream)
+        texto_extraido = extrai_texto_do_upload(nome, conteudo, hash_conteudo)
         texto_email = texto_extraido.strip() if texto_extraido else texto_email
 
     if not texto_email:
         return jsonify({"error": "Envie um texto ou um arquivo para processar."}), 400
 
     texto_email = processaTextoDigitado(texto_email)
-    resultado = classificar_email_e_sugerir_resposta(texto_email)
+
+    inicio = time.time()
+    metadados = {}
+    try:
+        resultado = classificar_email_e_sugerir_resposta(texto_email, metadados)
+    except SobrecargaError as erro:
+        registrar_classificacao(
+            texto_email, {}, metadados, int((time.time() - inicio) * 1000)
+        )
+        resposta = jsonify({"error": "Sistema com alto volume. Tente novamente em instantes."})
+        resposta.headers["Retry-After"] = str(erro.retry_after_s)
+        return resposta, 503
+
+    registrar_classificacao(
+        texto_email, resultado, metadados, int((time.time() - inicio) * 1000)
+    )
 
     return jsonify({
         "categoria": resultado.get("categoria"),
@@ -36,3 +58,11 @@ def processa_email():
         "resposta": resultado.get("resposta"),
         "preview": texto_email[:400],
     })
+
+
+@api_bp.get("/metricas")
+def metricas():
+    return jsonify({
+        "cache_extracao": obter_cache_extracao().estatisticas(),
+        "conversas": obter_conversas().estatisticas(),
+    })
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+VERSAO_EXTRATOR = "extrator-v1"
+PASTA_CACHE_PADRAO = os.path.join("data", "cache_extracao")
+TAMANHO_BLOCO_LEITURA = 1024 * 1024
+
+
+def ler_upload_com_hash(fluxo: BinaryIO, tamanho_bloco: int = TAMANHO_BLOCO_LEITURA) -> Tuple[bytes, str]:
+    """Le o upload em blocos, calculando o sha256 durante a leitura (sem uma segunda passada)."""
+    digest = hashlib.sha256()
+    blocos = []
+    while True:
+        bloco = fluxo.read(tamanho_bloco)
+        if not bloco:
+            break
+        digest.update(bloco)
+        blocos.append(bloco)
+    return b"".join(blocos), digest.hexdigest()
+
+
+def chave_extracao(tipo: str, file_bytes: bytes, hash_conteudo: Optional[str] = None) -> str:
+    return f"{tipo}-{VERSAO_EXTRATOR}-{hash_conteudo or hashlib.sha256(file_bytes).hexdigest()}"
+
+
+class CacheExtracao:
+    """Cache do texto extraido de uploads, por pagina.
+
+    Primeiro nivel: LRU em memoria. Segundo nivel: um JSON por arquivo em
+    disco, com limite de tamanho total; ao passar do limite os arquivos
+    menos acessados (mtime mais antigo) sao removidos.
+    """
+
+    def __init__(
+        self,
+        pasta: Optional[str] = PASTA_CACHE_PADRAO,
+        max_itens_memoria: int = 128,
+        max_bytes_disco: int = 200 * 1024 * 1024,
+    ):
+        self.pasta = pasta
+        self.max_itens_memoria = max_itens_memoria
+        self.max_bytes_disco = max_bytes_disco
+
+        self._memoria: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes_disco = 0
+
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.faltas = 0
+        self.cpu_economizada_ms = 0.0
+
+        if self.pasta:
+            try:
+                os.makedirs(self.pasta, exist_ok=True)
+                self._bytes_disco = sum(tamanho for _, _, tamanho in self._arquivos_disco())
+            except OSError as erro:
+                logger.error("EXTRACTION_CACHE_DISK_ERROR", extra={"error": str(erro)[:200]})
+                self.pasta = None
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.pasta, f"{chave}.json")
+
+    def _arquivos_disco(self) -> List[Tuple[float, str, int]]:
+        arquivos = []
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name.endswith(".json"):
+                    info = entrada.stat()
+                    arquivos.append((info.st_mtime, entrada.path, info.st_size))
+        return arquivos
+
+    def _guardar_memoria(self, chave: str, entrada: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memoria[chave] = entrada
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_itens_memoria:
+                self._memoria.popitem(last=False)
+
+    def _ler_disco(self, chave: str) -> Optional[Dict[str, Any]]:
+        if not self.pasta:
+            return None
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "r", encoding="utf-8") as arquivo:
+                entrada = json.load(arquivo)
+            os.utime(caminho)
+            return entrada
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as erro:
+            logger.warning("EXTRACTION_CACHE_READ_ERROR", extra={"error": str(erro)[:200]})
+            return None
+
+    def _gravar_disco(self, chave: str, entrada: Dict[str, Any]) -> None:
+        if not self.pasta:
+            return
+        caminho = self._caminho(chave)
+        caminho_temporario = None
+        try:
+            conteudo = json.dumps(entrada, ensure_ascii=False).encode("utf-8")
+            # Nome unico entre threads e entre processos (varios workers).
+            descritor, caminho_temporario = tempfile.mkstemp(dir=self.pasta, suffix=".tmp")
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(conteudo)
+        except OSError as erro:
+            logger.warning("EXTRACTION_CACHE_WRITE_ERROR", extra={"error": str(erro)[:200]})
+            self._remover_temporario(caminho_temporario)
+            return
+
+        with self._lock:
+            # Duas faltas simultaneas do mesmo upload sobrescrevem o mesmo
+            # arquivo: desconta o tamanho anterior para o total nao crescer.
+            try:
+                tamanho_anterior = os.path.getsize(caminho)
+            except OSError:
+                tamanho_anterior = 0
+            try:
+                os.replace(caminho_temporario, caminho)
+            except OSError as erro:
+                logger.warning("EXTRACTION_CACHE_WRITE_ERROR", extra={"error": str(erro)[:200]})
+                self._remover_temporario(caminho_temporario)
+                return
+
+            self._bytes_disco += len(conteudo) - tamanho_anterior
+            if self._bytes_disco <= self.max_bytes_disco:
+                return
+            self._evictar_disco()
+
+    def _remover_temporario(self, caminho_temporario: Optional[str]) -> None:
+        if not caminho_temporario:
+            return
+        try:
+            os.remove(caminho_temporario)
+        except OSError:
+            pass
+
+    def _evictar_disco(self) -> None:
+        alvo = int(self.max_bytes_disco * 0.9)
+        try:
+            arquivos = sorted(self._arquivos_disco())
+        except OSError:
+            return
+
+        self._bytes_disco = sum(tamanho for _, _, tamanho in arquivos)
+        for _, caminho, tamanho in arquivos:
+            if self._bytes_disco <= alvo:
+                break
+            try:
+                os.remove(caminho)
+                self._bytes_disco -= tamanho
+            except OSError:
+                continue
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                self._memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                self.cpu_economizada_ms += entrada.get("cpu_ms", 0.0)
+                return entrada
+
+        entrada = self._ler_disco(chave)
+        if entrada is not None:
+            self._guardar_memoria(chave, entrada)
+            with self._lock:
+                self.acertos_disco += 1
+                self.cpu_economizada_ms += entrada.get("cpu_ms", 0.0)
+        return entrada
+
+    def guardar(self, chave: str, entrada: Dict[str, Any]) -> None:
+        self._guardar_memoria(chave, entrada)
+        self._gravar_disco(chave, entrada)
+
+    def obter_ou_extrair(
+        self,
+        tipo: str,
+        file_bytes: bytes,
+        extrator: Callable[[bytes], Tuple[List[str], bool]],
+        hash_conteudo: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        chave = chave_extracao(tipo, file_bytes, hash_conteudo)
+        entrada = self.obter(chave)
+        if entrada is not None:
+            return entrada
+
+        with self._lock:
+            self.faltas += 1
+
+        inicio_cpu = time.thread_time()
+        paginas, escaneado = extrator(file_bytes)
+        entrada = {
+            "paginas": paginas,
+            "escaneado": escaneado,
+            "cpu_ms": round((time.thread_time() - inicio_cpu) * 1000, 3),
+        }
+        self.guardar(chave, entrada)
+        return entrada
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            acertos = self.acertos_memoria + self.acertos_disco
+            total = acertos + self.faltas
+            return {
+                "acertos_memoria": self.acertos_memoria,
+                "acertos_disco": self.acertos_disco,
+                "faltas": self.faltas,
+                "taxa_acerto": round(acertos / total, 4) if total else 0.0,
+                "cpu_economizada_ms": round(self.cpu_economizada_ms, 1),
+                "itens_memoria": len(self._memoria),
+                "bytes_disco": self._bytes_disco,
+            }
+
+
+_cache: Optional[CacheExtracao] = None
+_lock_cache = threading.Lock()
+
+
+def obter_cache_extracao() -> CacheExtracao:
+    global _cache
+    if _cache is not None:
+        return _cache
+
+    with _lock_cache:
+        if _cache is None:
+            pasta = os.getenv("EXTRACAO_CACHE_DIR", PASTA_CACHE_PADRAO)
+            _cache = CacheExtracao(
+                pasta=pasta or None,
+                max_itens_memoria=int(os.getenv("EXTRACAO_CACHE_MAX_ITENS", "128")),
+                max_bytes_disco=int(os.getenv("EXTRACAO_CACHE_MAX_MB", "200")) * 1024 * 1024,
+            )
+    return _cache
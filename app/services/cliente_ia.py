@@ -4,10 +4,12 @@ import re
 import time
 import uuid
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.utils.Respostas import (
-gerar_resposta_mensagem_social,gerar_resposta_trivial,gerar_resposta_spam,gerar_resposta_email_noreply, mensagem_social, mensagem_trivial, gerar_resposta_quota_excedida)
-from app.services.prompt.prompt import construir_prompt_classificacao
+gerar_resposta_mensagem_social,gerar_resposta_trivial,gerar_resposta_spam,gerar_resposta_email_noreply, mensagem_social, mensagem_trivial, gerar_resposta_quota_excedida, gerar_resposta_sobrecarga)
+from app.services.prompt.prompt import construir_prompt_classificacao, VERSAO_PROMPT
+from app.services.conversas import obter_conversas, conversas_ativas
+from app.services.controle_admissao import obter_controle_admissao, modo_sobrecarga, MODO_DEGRADAR, SobrecargaError
 import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
@@ -176,11 +178,18 @@ def erro_de_quota(erro: Exception) -> bool:
 
 
 
-def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
+def classificar_email_e_sugerir_resposta(
+    texto_email: str,
+    metadados: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
     id_requisicao = str(uuid.uuid4())
     texto_original = (texto_email or "").strip()
+    if metadados is None:
+        metadados = {}
+    metadados["caminho"] = "regra"
 
     if not texto_original:
+        metadados["caminho"] = "vazio"
         return {
             "categoria": "Improdutivo",
             "resposta": "Mensagem recebida.",
@@ -188,21 +197,26 @@ def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
         }
 
     if mensagem_social(texto_original):
+        metadados["caminho"] = "regra_social"
         return gerar_resposta_mensagem_social(texto_original)
 
     if mensagem_trivial(texto_original):
+        metadados["caminho"] = "regra_trivial"
         return gerar_resposta_trivial()
 
     if spam_forte(texto_original):
+        metadados["caminho"] = "regra_spam"
         return gerar_resposta_spam()
 
     if email_noreply(texto_original):
+        metadados["caminho"] = "regra_noreply"
         return gerar_resposta_email_noreply()
 
     chave_api = os.getenv("GEMINI_API_KEY", "")
     nome_modelo = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
 
     if not chave_api:
+        metadados["caminho"] = "ia_nao_configurada"
         return {
             "categoria": "Produtivo",
             "resposta": "Como posso ajudar você?",
@@ -212,17 +226,34 @@ def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
     genai.configure(api_key=chave_api)
     modelo = genai.GenerativeModel(nome_modelo)
 
-    texto_para_ia = limitar_texto_para_ia(texto_original, maximo_caracteres=6000)
-    prompt = construir_prompt_classificacao(texto_para_ia)
+    contexto_conversa = obter_conversas().preparar(texto_original) if conversas_ativas() else None
+
+    if contexto_conversa and contexto_conversa["incremental"]:
+        texto_para_ia = limitar_texto_para_ia(contexto_conversa["texto_para_ia"], maximo_caracteres=6000)
+        prompt = construir_prompt_classificacao(texto_para_ia, contexto_conversa["contexto_conversa"])
+        metadados["caminho"] = "ia_incremental"
+    else:
+        texto_para_ia = limitar_texto_para_ia(texto_original, maximo_caracteres=6000)
+        prompt = construir_prompt_classificacao(texto_para_ia)
+        metadados["caminho"] = "ia"
+    metadados["modelo"] = nome_modelo
+    metadados["versao_prompt"] = VERSAO_PROMPT
+
+    controle_admissao = obter_controle_admissao()
 
     def chamar_ia(texto_prompt: str, temperatura: float = 0.2) -> str:
-        resposta = modelo.generate_content(
-            texto_prompt,
-            generation_config={
-                "temperature": temperatura,
-                "max_output_tokens": 800,
-            }
-        )
+        inicio_chamada = time.time()
+        try:
+            with controle_admissao.admitir():
+                resposta = modelo.generate_content(
+                    texto_prompt,
+                    generation_config={
+                        "temperature": temperatura,
+                        "max_output_tokens": 800,
+                    }
+                )
+        finally:
+            metadados["tempo_ia_ms"] = metadados.get("tempo_ia_ms", 0) + int((time.time() - inicio_chamada) * 1000)
         return (getattr(resposta, "text", "") or "").strip()
     
     print("\n===== INPUT_TO_AI (preview) =====", flush=True)
@@ -264,7 +295,19 @@ def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
                 print("===== /RAW_RESPONSE =====\n", flush=True)
 
                 prompt_correcao = construir_prompt_correcao_json(resposta_bruta)
-                resposta_corrigida = chamar_ia(prompt_correcao, temperatura=0.0)
+                try:
+                    resposta_corrigida = chamar_ia(prompt_correcao, temperatura=0.0)
+                except SobrecargaError as erro_admissao:
+                    # A primeira chamada ja foi atendida: sem vaga para a correcao,
+                    # cai no resultado padrao de JSON invalido em vez de responder 503.
+                    logger.warning(
+                        "AI_JSON_RETRY_REJECTED",
+                        extra={
+                            "request_id": id_requisicao,
+                            "reason": erro_admissao.motivo,
+                        }
+                    )
+                    resposta_corrigida = ""
 
                 print("\n===== FIXED_RESPONSE (preview) =====", flush=True)
                 print(resposta_corrigida[:2000], flush=True)
@@ -278,6 +321,7 @@ def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
                         dados_reparados_final = reparar_json_flexivel(resposta_corrigida)
                         resultado = sanitizar_resultado_ia(dados_reparados_final)
                     except Exception:
+                        metadados["caminho"] = "ia_json_invalido"
                         logger.error(
                             "AI_JSON_FIX_FAILED",
                             extra={
@@ -293,16 +337,37 @@ def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
 
         if resultado.get("categoria") == "Produtivo":
             if spam_forte(texto_original) or mensagem_trivial(texto_original) or mensagem_social(texto_original):
-                return {
+                metadados["caminho"] = "ia_corrigida_regra"
+                resultado = {
                     "categoria": "Improdutivo",
                     "resposta": "Obrigado pela mensagem.",
                     "justificativa_curta": "Conteúdo sem necessidade de ação (social/trivial/spam)."
                 }
 
+        if contexto_conversa:
+            obter_conversas().atualizar(contexto_conversa, resultado)
+
         return resultado
 
+    except SobrecargaError as erro:
+        logger.warning(
+            "AI_ADMISSION_REJECTED",
+            extra={
+                "request_id": id_requisicao,
+                "reason": erro.motivo,
+                **controle_admissao.estatisticas(),
+            }
+        )
+        if modo_sobrecarga() == MODO_DEGRADAR:
+            metadados["caminho"] = "sobrecarga_degradado"
+            return gerar_resposta_sobrecarga()
+
+        metadados["caminho"] = "sobrecarga_rejeitado"
+        raise
+
     except Exception as erro:
         if erro_de_quota(erro):
+            metadados["caminho"] = "ia_quota_excedida"
             logger.warning(
                 "AI_QUOTA_EXCEEDED",
                 extra={
@@ -313,6 +378,7 @@ def classificar_email_e_sugerir_resposta(texto_email: str) -> Dict[str, str]:
             )
             return gerar_resposta_quota_excedida()
 
+        metadados["caminho"] = "ia_erro"
         logger.error(
             "AI_CALL_ERROR",
             extra={
@@ -0,0 +1,162 @@
+import os
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MODO_REJEITAR = "rejeitar"
+MODO_DEGRADAR = "degradar"
+
+
+class SobrecargaError(Exception):
+    def __init__(self, retry_after_s: int, motivo: str):
+        super().__init__(motivo)
+        self.retry_after_s = retry_after_s
+        self.motivo = motivo
+
+
+class ControleAdmissao:
+    """Admissao das chamadas ao modelo com base no atraso de fila (estilo CoDel).
+
+    Limita as chamadas em voo e mede quanto cada uma esperou por uma vaga.
+    Se o atraso fica acima de `alvo_ms` durante um `intervalo_ms` inteiro,
+    entra em modo de descarte: sem vaga livre, a chamada espera no maximo
+    `alvo_ms` e e rejeitada em vez de ficar na fila. So sai do descarte
+    quando as chamadas que de fato esperaram ficam abaixo do alvo durante
+    um intervalo inteiro; uma vaga livre pontual nao basta.
+    """
+
+    def __init__(
+        self,
+        max_em_voo: int = 8,
+        alvo_ms: float = 100.0,
+        intervalo_ms: float = 1000.0,
+        espera_maxima_ms: float = 2000.0,
+    ):
+        self.max_em_voo = max_em_voo
+        self.alvo_s = alvo_ms / 1000
+        self.intervalo_s = intervalo_ms / 1000
+        self.espera_maxima_s = espera_maxima_ms / 1000
+
+        self._vagas = threading.BoundedSemaphore(max_em_voo)
+        self._lock = threading.Lock()
+        self._acima_do_alvo_ate: Optional[float] = None
+        self._abaixo_do_alvo_desde: Optional[float] = None
+        self._descartando = False
+        self._aguardando = 0
+
+        self.em_voo = 0
+        self.admitidos = 0
+        self.rejeitados = 0
+
+    def retry_after_s(self) -> int:
+        return max(1, math.ceil(self.intervalo_s))
+
+    def _registrar_espera(self, espera_s: float, esperou: bool) -> None:
+        agora = time.monotonic()
+        with self._lock:
+            if espera_s < self.alvo_s:
+                self._acima_do_alvo_ate = None
+                if not self._descartando or not esperou:
+                    return
+                if self._abaixo_do_alvo_desde is None:
+                    self._abaixo_do_alvo_desde = agora
+                elif agora - self._abaixo_do_alvo_desde >= self.intervalo_s:
+                    self._descartando = False
+                    self._abaixo_do_alvo_desde = None
+                    logger.info("ADMISSION_RECOVERED")
+                return
+
+            self._abaixo_do_alvo_desde = None
+            if self._acima_do_alvo_ate is None:
+                self._acima_do_alvo_ate = agora + self.intervalo_s
+            elif agora >= self._acima_do_alvo_ate and not self._descartando:
+                self._descartando = True
+                logger.warning(
+                    "ADMISSION_SHEDDING",
+                    extra={"queue_delay_ms": int(espera_s * 1000), "in_flight": self.em_voo},
+                )
+
+    def _rejeitar(self, motivo: str) -> SobrecargaError:
+        with self._lock:
+            self.rejeitados += 1
+        return SobrecargaError(self.retry_after_s(), motivo)
+
+    def _obter_vaga(self) -> None:
+        inicio = time.monotonic()
+
+        if self._vagas.acquire(blocking=False):
+            # Uma vaga livre so indica fila vazia se ninguem estiver esperando.
+            with self._lock:
+                fila_vazia = self._aguardando == 0
+            if fila_vazia:
+                self._registrar_espera(0.0, esperou=False)
+            return
+
+        with self._lock:
+            descartando = self._descartando
+            self._aguardando += 1
+        try:
+            # Em descarte a espera e curta: mede o atraso sem deixar a fila crescer.
+            admitido = self._vagas.acquire(
+                timeout=self.alvo_s if descartando else self.espera_maxima_s
+            )
+        finally:
+            with self._lock:
+                self._aguardando -= 1
+
+        self._registrar_espera(time.monotonic() - inicio, esperou=True)
+        if not admitido:
+            raise self._rejeitar("descartando" if descartando else "espera_excedida")
+
+    @contextmanager
+    def admitir(self) -> Iterator[None]:
+        self._obter_vaga()
+        with self._lock:
+            self.em_voo += 1
+            self.admitidos += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.em_voo -= 1
+            self._vagas.release()
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "em_voo": self.em_voo,
+                "admitidos": self.admitidos,
+                "rejeitados": self.rejeitados,
+                "aguardando": self._aguardando,
+                "descartando": int(self._descartando),
+            }
+
+
+_controle: Optional[ControleAdmissao] = None
+_lock_controle = threading.Lock()
+
+
+def modo_sobrecarga() -> str:
+    modo = os.getenv("ADMISSAO_MODO", MODO_REJEITAR).strip().lower()
+    return modo if modo in (MODO_REJEITAR, MODO_DEGRADAR) else MODO_REJEITAR
+
+
+def obter_controle_admissao() -> ControleAdmissao:
+    global _controle
+    if _controle is not None:
+        return _controle
+
+    with _lock_controle:
+        if _controle is None:
+            _controle = ControleAdmissao(
+                max_em_voo=int(os.getenv("ADMISSAO_MAX_EM_VOO", "8")),
+                alvo_ms=float(os.getenv("ADMISSAO_ALVO_MS", "100")),
+                intervalo_ms=float(os.getenv("ADMISSAO_INTERVALO_MS", "1000")),
+                espera_maxima_ms=float(os.getenv("ADMISSAO_ESPERA_MAXIMA_MS", "2000")),
+            )
+    return _controle
@@ -0,0 +1,288 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+REGEX_CABECALHO = re.compile(
+    r"^\s*(assunto|subject|message-id|in-reply-to|references|de|from|para|to|data|date|enviado|sent|cc)\s*:\s*(.*)$",
+    re.IGNORECASE,
+)
+REGEX_ATRIBUICAO = re.compile(r"^\s*(em|on)\s.+(escreveu|wrote)\s*:\s*$", re.IGNORECASE)
+REGEX_SEPARADOR = re.compile(
+    r"^\s*-{2,}\s*(original message|mensagem original|forwarded message|mensagem encaminhada)\s*-{2,}\s*$",
+    re.IGNORECASE,
+)
+REGEX_DIVISORIA = re.compile(r"^\s*[_-]{10,}\s*$")
+REGEX_REMETENTE = re.compile(r"^\s*(de|from)\s*:\s*\S", re.IGNORECASE)
+REGEX_ENVIO = re.compile(r"^\s*(enviado|sent|data|date)\s*:\s*\S", re.IGNORECASE)
+REGEX_PREFIXO_ASSUNTO = re.compile(r"^\s*((re|res|fw|fwd|enc|tr)\s*:\s*)+", re.IGNORECASE)
+REGEX_MESSAGE_ID = re.compile(r"<[^<>\s]+>")
+
+TAMANHO_IMPRESSAO = 2000
+TAMANHO_RESUMO = 500
+TAMANHO_TRECHO_RESUMO = 160
+
+
+def separar_cabecalho(texto: str) -> Tuple[Dict[str, str], str]:
+    linhas = (texto or "").split("\n")
+    cabecalhos: Dict[str, str] = {}
+
+    indice = 0
+    while indice < len(linhas):
+        match = REGEX_CABECALHO.match(linhas[indice])
+        if not match:
+            break
+        cabecalhos.setdefault(match.group(1).lower(), match.group(2).strip())
+        indice += 1
+
+    if not cabecalhos:
+        return {}, (texto or "").strip()
+    return cabecalhos, "\n".join(linhas[indice:]).strip()
+
+
+def separar_historico(corpo: str) -> Tuple[str, str]:
+    linhas = (corpo or "").split("\n")
+
+    for indice, linha in enumerate(linhas):
+        if indice == 0:
+            continue
+        inicio_historico = (
+            linha.lstrip().startswith(">")
+            or REGEX_ATRIBUICAO.match(linha)
+            or REGEX_SEPARADOR.match(linha)
+            or REGEX_DIVISORIA.match(linha)
+            or (
+                REGEX_REMETENTE.match(linha)
+                and indice + 1 < len(linhas)
+                and REGEX_ENVIO.match(linhas[indice + 1])
+            )
+        )
+        if inicio_historico:
+            return "\n".join(linhas[:indice]).strip(), "\n".join(linhas[indice:]).strip()
+
+    return (corpo or "").strip(), ""
+
+
+def linha_de_citacao(linha: str) -> bool:
+    """Linhas que o cliente de e-mail acrescenta ao citar (atribuicao estilo
+    Gmail, separadores e o bloco De:/Enviado:/Para:/Assunto: do Outlook)."""
+    return bool(
+        REGEX_ATRIBUICAO.match(linha)
+        or REGEX_SEPARADOR.match(linha)
+        or REGEX_DIVISORIA.match(linha)
+        or REGEX_CABECALHO.match(linha)
+    )
+
+
+def normalizar_para_impressao(texto: str) -> str:
+    linhas = []
+    for linha in (texto or "").split("\n"):
+        linha = linha.lstrip("> \t")
+        if not linha or linha_de_citacao(linha):
+            continue
+        linhas.append(linha)
+    return re.sub(r"\s+", " ", " ".join(linhas)).strip().lower()
+
+
+def impressao_texto(texto: str) -> str:
+    normalizado = normalizar_para_impressao(texto)[:TAMANHO_IMPRESSAO]
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest() if normalizado else ""
+
+
+def normalizar_assunto(assunto: str) -> str:
+    return re.sub(r"\s+", " ", REGEX_PREFIXO_ASSUNTO.sub("", assunto or "")).strip().lower()
+
+
+def resumir(resumo_anterior: str, nova_mensagem: str) -> str:
+    trecho = re.sub(r"\s+", " ", nova_mensagem or "").strip()[:TAMANHO_TRECHO_RESUMO]
+    partes = [parte for parte in (resumo_anterior or "").split("\n") if parte]
+    if trecho:
+        partes.append(f"- {trecho}")
+
+    while partes and len("\n".join(partes)) > TAMANHO_RESUMO:
+        partes.pop(0)
+    return "\n".join(partes)
+
+
+def remover_nivel_citacao(texto: str) -> str:
+    linhas = []
+    for linha in (texto or "").split("\n"):
+        sem_espaco = linha.lstrip()
+        if sem_espaco.startswith(">"):
+            linha = sem_espaco[1:]
+            if linha.startswith(" "):
+                linha = linha[1:]
+        linhas.append(linha)
+    return "\n".join(linhas)
+
+
+def separar_mensagens_historico(historico: str, max_mensagens: int = 50) -> List[str]:
+    """Quebra o historico citado nas mensagens anteriores, da mais antiga para a mais nova."""
+    mensagens = []
+    restante = historico or ""
+    while restante and len(mensagens) < max_mensagens:
+        linhas = restante.split("\n")
+        indice = 0
+        while indice < len(linhas) and (not linhas[indice].strip() or linha_de_citacao(linhas[indice])):
+            indice += 1
+
+        mensagem, restante = separar_historico(remover_nivel_citacao("\n".join(linhas[indice:])))
+        if mensagem:
+            mensagens.append(mensagem)
+    return list(reversed(mensagens))
+
+
+def resumir_historico(historico: str) -> str:
+    resumo = ""
+    for mensagem in separar_mensagens_historico(historico):
+        resumo = resumir(resumo, mensagem)
+    return resumo
+
+
+class EstadoConversas:
+    """Estado das mensagens ja classificadas, em LRU limitado.
+
+    Cada mensagem guarda a propria classificacao e um resumo curto da
+    cadeia de mensagens ate ela, indexado so pela identidade dela
+    (Message-ID e impressao do corpo). Uma resposta encontra a mensagem a
+    que responde (In-Reply-To/References ou impressao do historico
+    citado) e herda o resumo dessa cadeia; respostas irmas, como as de
+    varios clientes ao mesmo aviso, nunca enxergam umas as outras.
+    """
+
+    def __init__(self, max_mensagens: int = 1000):
+        self.max_mensagens = max_mensagens
+        self.max_apelidos = max_mensagens * 4
+
+        self._mensagens: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._apelidos: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _guardar_apelido(self, apelido: str, chave: str) -> None:
+        self._apelidos[apelido] = chave
+        self._apelidos.move_to_end(apelido)
+        while len(self._apelidos) > self.max_apelidos:
+            self._apelidos.popitem(last=False)
+
+    def _buscar(self, apelidos: List[str], assunto: str) -> Optional[Dict[str, Any]]:
+        candidatos = []
+        for apelido in apelidos:
+            chave = self._apelidos.get(apelido)
+            if chave is None or any(chave == existente for existente, _ in candidatos):
+                continue
+            estado = self._mensagens.get(chave)
+            if estado is not None:
+                candidatos.append((chave, estado))
+
+        if not candidatos:
+            return None
+
+        chave, estado = candidatos[0]
+        if assunto:
+            for candidato in candidatos:
+                if candidato[1].get("assunto") == assunto:
+                    chave, estado = candidato
+                    break
+        self._mensagens.move_to_end(chave)
+        return estado
+
+    def preparar(self, texto_email: str) -> Dict[str, Any]:
+        cabecalhos, corpo = separar_cabecalho(texto_email)
+        nova_mensagem, historico = separar_historico(corpo)
+
+        # Mensagem respondida primeiro, depois os ancestrais mais proximos.
+        ids_anteriores = REGEX_MESSAGE_ID.findall(cabecalhos.get("in-reply-to", ""))
+        ids_anteriores += reversed(REGEX_MESSAGE_ID.findall(cabecalhos.get("references", "")))
+        id_mensagem = REGEX_MESSAGE_ID.findall(cabecalhos.get("message-id", ""))
+        assunto = normalizar_assunto(cabecalhos.get("assunto") or cabecalhos.get("subject", ""))
+
+        # So para busca: o assunto sozinho nao identifica a conversa ("Re:
+        # Boleto" e comum entre clientes diferentes) e so desempata em _buscar.
+        apelidos_busca = [f"msgid:{item}" for item in ids_anteriores]
+        if historico:
+            apelidos_busca.append(f"impressao:{impressao_texto(historico)}")
+
+        with self._lock:
+            estado = self._buscar(apelidos_busca, assunto)
+
+        # Identidade da propria mensagem: a unica coisa registrada em atualizar.
+        apelidos_proprios = [f"msgid:{item}" for item in id_mensagem]
+        impressao_completa = impressao_texto(corpo)
+        if impressao_completa:
+            apelidos_proprios.append(f"impressao:{impressao_completa}")
+
+        contexto = {
+            "chave": f"mensagem:{impressao_completa or hashlib.sha256(corpo.encode('utf-8')).hexdigest()}",
+            "apelidos": apelidos_proprios,
+            "nova_mensagem": nova_mensagem,
+            "historico": historico,
+            "assunto": assunto,
+            "mensagens_anteriores": 0,
+            "incremental": False,
+            "texto_para_ia": texto_email,
+            "contexto_conversa": "",
+        }
+
+        if estado is not None and nova_mensagem:
+            contexto["incremental"] = True
+            contexto["texto_para_ia"] = nova_mensagem
+            contexto["contexto_conversa"] = (
+                f"Classificação anterior da conversa: {estado['categoria']}\n"
+                f"Resumo das mensagens anteriores:\n{estado['resumo']}"
+            )
+            contexto["resumo_anterior"] = estado["resumo"]
+            contexto["mensagens_anteriores"] = estado["mensagens"]
+
+        return contexto
+
+    def atualizar(self, contexto: Dict[str, Any], resultado: Dict[str, Any]) -> None:
+        if "resumo_anterior" in contexto:
+            resumo_anterior = contexto["resumo_anterior"]
+        else:
+            # Primeira vez que a conversa aparece: o historico citado
+            # tambem entra no resumo, senao as respostas seguintes o perdem.
+            resumo_anterior = resumir_historico(contexto.get("historico", ""))
+
+        chave = contexto["chave"]
+        with self._lock:
+            self._mensagens[chave] = {
+                "categoria": resultado.get("categoria"),
+                "assunto": contexto.get("assunto", ""),
+                "resumo": resumir(resumo_anterior, contexto["nova_mensagem"]),
+                "mensagens": contexto.get("mensagens_anteriores", 0) + 1,
+                "atualizado_em": time.time(),
+            }
+            self._mensagens.move_to_end(chave)
+            while len(self._mensagens) > self.max_mensagens:
+                self._mensagens.popitem(last=False)
+
+            for apelido in contexto["apelidos"]:
+                self._guardar_apelido(apelido, chave)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"mensagens": len(self._mensagens), "apelidos": len(self._apelidos)}
+
+
+_conversas: Optional[EstadoConversas] = None
+_lock_conversas = threading.Lock()
+
+
+def conversas_ativas() -> bool:
+    return os.getenv("CONVERSAS_ATIVO", "1").lower() not in ("0", "false", "nao", "não")
+
+
+def obter_conversas() -> EstadoConversas:
+    global _conversas
+    if _conversas is not None:
+        return _conversas
+
+    with _lock_conversas:
+        if _conversas is None:
+            _conversas = EstadoConversas(
+                max_mensagens=int(os.getenv("CONVERSAS_MAX", "1000")),
+            )
+    return _conversas
@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_BANCO_PADRAO = os.path.join("data", "historico.db")
+
+COLUNAS_HISTORICO = [
+    "criado_em",
+    "hash_texto",
+    "tamanho_texto",
+    "categoria",
+    "caminho",
+    "modelo",
+    "versao_prompt",
+    "tempo_total_ms",
+    "tempo_ia_ms",
+]
+
+SQL_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS historico_classificacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    criado_em REAL NOT NULL,
+    hash_texto TEXT NOT NULL,
+    tamanho_texto INTEGER NOT NULL,
+    categoria TEXT,
+    caminho TEXT NOT NULL,
+    modelo TEXT,
+    versao_prompt TEXT,
+    tempo_total_ms INTEGER,
+    tempo_ia_ms INTEGER
+)
+"""
+
+SQL_CRIAR_INDICES = [
+    "CREATE INDEX IF NOT EXISTS idx_historico_criado_em ON historico_classificacoes (criado_em)",
+    "CREATE INDEX IF NOT EXISTS idx_historico_hash_texto ON historico_classificacoes (hash_texto, criado_em)",
+]
+
+SQL_INSERIR = (
+    "INSERT INTO historico_classificacoes ("
+    + ", ".join(COLUNAS_HISTORICO)
+    + ") VALUES ("
+    + ", ".join("?" for _ in COLUNAS_HISTORICO)
+    + ")"
+)
+
+
+def hash_texto_email(texto: str) -> str:
+    return hashlib.sha256((texto or "").encode("utf-8")).hexdigest()
+
+
+class HistoricoClassificacoes:
+    """Historico append-only das classificacoes em SQLite (WAL).
+
+    As gravacoes entram numa fila limitada e sao inseridas em lote por uma
+    thread de fundo, fora do caminho da requisicao. Se a fila estiver cheia
+    o registro e descartado (e contabilizado) em vez de bloquear a API.
+    """
+
+    def __init__(
+        self,
+        caminho_banco: str = CAMINHO_BANCO_PADRAO,
+        tamanho_maximo_fila: int = 10000,
+        tamanho_lote: int = 500,
+        intervalo_flush_s: float = 1.0,
+    ):
+        self.caminho_banco = caminho_banco
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush_s = intervalo_flush_s
+
+        self._fila: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=tamanho_maximo_fila)
+        self._lock_escrita = threading.Lock()
+        self._lock_contadores = threading.Lock()
+        self._encerrado = threading.Event()
+        self.total_gravados = 0
+        self.total_descartados = 0
+
+        pasta = os.path.dirname(caminho_banco)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        self._conexao_escrita = self._conectar()
+        self._conexao_escrita.execute(SQL_CRIAR_TABELA)
+        for sql_indice in SQL_CRIAR_INDICES:
+            self._conexao_escrita.execute(sql_indice)
+        self._conexao_escrita.commit()
+
+        self._thread = threading.Thread(
+            target=self._loop_flush, name="historico-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(self.caminho_banco, check_same_thread=False)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        return conexao
+
+    def registrar(self, registro: Dict[str, Any]) -> bool:
+        if self._encerrado.is_set():
+            return False
+
+        linha = (
+            registro.get("criado_em") or time.time(),
+            registro.get("hash_texto", ""),
+            int(registro.get("tamanho_texto") or 0),
+            registro.get("categoria"),
+            registro.get("caminho", "desconhecido"),
+            registro.get("modelo"),
+            registro.get("versao_prompt"),
+            registro.get("tempo_total_ms"),
+            registro.get("tempo_ia_ms"),
+        )
+        try:
+            self._fila.put_nowait(linha)
+            return True
+        except queue.Full:
+            with self._lock_contadores:
+                self.total_descartados += 1
+            return False
+
+    def _coletar_lote(self, bloquear: bool) -> List[tuple]:
+        lote: List[tuple] = []
+        try:
+            primeiro = self._fila.get(timeout=self.intervalo_flush_s) if bloquear else self._fila.get_nowait()
+        except queue.Empty:
+            return lote
+        if primeiro is not None:
+            lote.append(primeiro)
+        else:
+            self._fila.task_done()
+
+        while len(lote) < self.tamanho_lote:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                lote.append(item)
+            else:
+                self._fila.task_done()
+        return lote
+
+    def _gravar_lote(self, lote: List[tuple]) -> None:
+        if not lote:
+            return
+        try:
+            with self._lock_escrita:
+                with self._conexao_escrita:
+                    self._conexao_escrita.executemany(SQL_INSERIR, lote)
+            with self._lock_contadores:
+                self.total_gravados += len(lote)
+        except sqlite3.Error as erro:
+            with self._lock_contadores:
+                self.total_descartados += len(lote)
+            logger.error(
+                "HISTORY_FLUSH_ERROR",
+                extra={"batch_size": len(lote), "error": str(erro)[:200]},
+            )
+        finally:
+            for _ in lote:
+                self._fila.task_done()
+
+    def _loop_flush(self) -> None:
+        while not self._encerrado.is_set():
+            self._gravar_lote(self._coletar_lote(bloquear=True))
+
+    def flush(self) -> None:
+        """Grava o que esta na fila e espera o lote que a thread de fundo
+        ja retirou da fila terminar de ser gravado."""
+        while True:
+            lote = self._coletar_lote(bloquear=False)
+            if not lote:
+                break
+            self._gravar_lote(lote)
+        self._fila.join()
+
+    def fechar(self) -> None:
+        if self._encerrado.is_set():
+            return
+        self._encerrado.set()
+        try:
+            self._fila.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=self.intervalo_flush_s + 1)
+        self.flush()
+        with self._lock_escrita:
+            self._conexao_escrita.close()
+
+    def pendentes(self) -> int:
+        return self._fila.qsize()
+
+    def _consultar(self, sql: str, parametros: tuple) -> List[Dict[str, Any]]:
+        conexao = self._conectar()
+        try:
+            conexao.row_factory = sqlite3.Row
+            return [dict(linha) for linha in conexao.execute(sql, parametros)]
+        finally:
+            conexao.close()
+
+    def consultar_por_periodo(self, inicio: float, fim: float, limite: int = 1000) -> List[Dict[str, Any]]:
+        return self._consultar(
+            "SELECT * FROM historico_classificacoes "
+            "WHERE criado_em >= ? AND criado_em < ? ORDER BY criado_em LIMIT ?",
+            (inicio, fim, limite),
+        )
+
+    def consultar_por_hash(self, hash_texto: str, limite: int = 10) -> List[Dict[str, Any]]:
+        return self._consultar(
+            "SELECT * FROM historico_classificacoes "
+            "WHERE hash_texto = ? ORDER BY criado_em DESC LIMIT ?",
+            (hash_texto, limite),
+        )
+
+    def _iterar_linhas(self, inicio: Optional[float], fim: Optional[float]) -> Iterator[tuple]:
+        conexao = self._conectar()
+        try:
+            cursor = conexao.execute(
+                "SELECT " + ", ".join(COLUNAS_HISTORICO) + " FROM historico_classificacoes "
+                "WHERE criado_em >= ? AND criado_em < ? ORDER BY criado_em",
+                (inicio if inicio is not None else 0.0, fim if fim is not None else float("inf")),
+            )
+            while True:
+                linhas = cursor.fetchmany(5000)
+                if not linhas:
+                    break
+                yield from linhas
+        finally:
+            conexao.close()
+
+    def exportar_jsonl(self, caminho_saida: str, inicio: Optional[float] = None, fim: Optional[float] = None) -> int:
+        total = 0
+        with open(caminho_saida, "w", encoding="utf-8") as arquivo:
+            for linha in self._iterar_linhas(inicio, fim):
+                arquivo.write(json.dumps(dict(zip(COLUNAS_HISTORICO, linha)), ensure_ascii=False))
+                arquivo.write("\n")
+                total += 1
+        return total
+
+    def exportar_colunar(self, pasta_saida: str, inicio: Optional[float] = None, fim: Optional[float] = None) -> int:
+        """Exporta uma coluna por arquivo (um valor JSON por linha) + schema.json.
+
+        Mesmo layout logico de um Parquet, sem depender de pyarrow: cada
+        coluna pode ser lida isoladamente na analise offline.
+        """
+        os.makedirs(pasta_saida, exist_ok=True)
+        arquivos = {
+            coluna: open(os.path.join(pasta_saida, f"{coluna}.jsonl"), "w", encoding="utf-8")
+            for coluna in COLUNAS_HISTORICO
+        }
+        total = 0
+        try:
+            for linha in self._iterar_linhas(inicio, fim):
+                for coluna, valor in zip(COLUNAS_HISTORICO, linha):
+                    arquivos[coluna].write(json.dumps(valor, ensure_ascii=False))
+                    arquivos[coluna].write("\n")
+                total += 1
+        finally:
+            for arquivo in arquivos.values():
+                arquivo.close()
+
+        with open(os.path.join(pasta_saida, "schema.json"), "w", encoding="utf-8") as arquivo:
+            json.dump({"colunas": COLUNAS_HISTORICO, "linhas": total}, arquivo, ensure_ascii=False)
+        return total
+
+
+_historico: Optional[HistoricoClassificacoes] = None
+_historico_indisponivel = False
+_lock_historico = threading.Lock()
+
+
+def historico_ativo() -> bool:
+    return os.getenv("HISTORICO_ATIVO", "1").lower() not in ("0", "false", "nao", "não")
+
+
+def obter_historico() -> Optional[HistoricoClassificacoes]:
+    global _historico, _historico_indisponivel
+    if _historico_indisponivel or not historico_ativo():
+        return None
+    if _historico is not None:
+        return _historico
+
+    with _lock_historico:
+        if _historico is None:
+            try:
+                _historico = HistoricoClassificacoes(
+                    caminho_banco=os.getenv("HISTORICO_DB_PATH", CAMINHO_BANCO_PADRAO),
+                    tamanho_maximo_fila=int(os.getenv("HISTORICO_MAX_FILA", "10000")),
+                )
+                atexit.register(_historico.fechar)
+            except (sqlite3.Error, OSError) as erro:
+                logger.error("HISTORY_INIT_ERROR", extra={"error": str(erro)[:200]})
+                _historico_indisponivel = True
+                return None
+    return _historico
+
+
+def registrar_classificacao(
+    texto_email: str,
+    resultado: Dict[str, Any],
+    metadados: Dict[str, Any],
+    tempo_total_ms: int,
+) -> bool:
+    historico = obter_historico()
+    if historico is None:
+        return False
+
+    return historico.registrar({
+        "hash_texto": hash_texto_email(texto_email),
+        "tamanho_texto": len(texto_email or ""),
+        "categoria": resultado.get("categoria"),
+        "caminho": metadados.get("caminho", "desconhecido"),
+        "modelo": metadados.get("modelo"),
+        "versao_prompt": metadados.get("versao_prompt"),
+        "tempo_total_ms": tempo_total_ms,
+        "tempo_ia_ms": metadados.get("tempo_ia_ms"),
+    })
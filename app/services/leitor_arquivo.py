@@ -1,3 +1,5 @@
+from typing import Optional
+
 ALLOWED_EXTENSIONS = {"txt", "pdf"}
 
 
@@ -67,7 +69,7 @@ def extraiEscaneado(texto_extraido: str) -> bool:
     return len(t) < 80
 
 
-def extrai_texto_do_upload(nome_arquivo: str, file_bytes: bytes) -> str:
+def extrai_texto_do_upload(nome_arquivo: str, file_bytes: bytes, hash_conteudo: Optional[str] = None) -> str:
     ext = nome_arquivo.rsplit(".", 1)[1].lower().strip()
 
     if ext == "txt":
@@ -78,6 +80,6 @@ def extrai_texto_do_upload(nome_arquivo: str, file_bytes: bytes) -> str:
     if ext == "pdf":
         from app.utils.ProcessaPdf import ProcessaPdfImportado
 
-        return ProcessaPdfImportado(file_bytes)
+        return ProcessaPdfImportado(file_bytes, hash_conteudo)
 
     return ""
@@ -1,4 +1,18 @@
-def construir_prompt_classificacao(texto_email: str) -> str:
+VERSAO_PROMPT = "classificacao-v1"
+
+
+def construir_secao_conversa(contexto_conversa: str) -> str:
+    if not contexto_conversa:
+        return ""
+    return f"""
+CONTEXTO DA CONVERSA (mensagens anteriores já classificadas):
+{contexto_conversa}
+
+Classifique apenas a NOVA mensagem abaixo, usando o contexto se necessário.
+"""
+
+
+def construir_prompt_classificacao(texto_email: str, contexto_conversa: str = "") -> str:
     return f"""
 Você é um assistente de classificação de e-mails para uma empresa do setor financeiro.
 
@@ -46,7 +60,7 @@ REGRAS DA RESPOSTA:
 
 FORMATO DE SAÍDA:
 {{"categoria":"Produtivo|Improdutivo","resposta":"...","justificativa_curta":"..."}}
-
+{construir_secao_conversa(contexto_conversa)}
 E-mail para classificar:
 \"\"\"{texto_email}\"\"\"
 
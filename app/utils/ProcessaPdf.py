@@ -1,19 +1,67 @@
 from __future__ import annotations
 from io import BytesIO
+from typing import List, Optional, Tuple
 from pypdf import PdfReader
 
 from app.services.leitor_arquivo import extraiEscaneado, extrair_texto_pagina, limpar_texto
+from app.services.cache_extracao import obter_cache_extracao
 
+MENSAGEM_PDF_ESCANEADO = (
+    "Nao consegui extrair texto suficiente do PDF. "
+    "Ele parece ser um PDF escaneado (imagem). "
+    "Se você puder, envie o conteudo em .txt, copie/cole o texto do e-mail, "
+    "ou gere um PDF 'pesquisa­vel' (exportado com texto)."
+)
 
-def ProcessaPdfImportado(file_bytes: bytes) -> str:
+
+def recursos_tem_fonte(recursos, profundidade: int = 0) -> bool:
+    try:
+        recursos = recursos.get_object() if recursos is not None else None
+        if not recursos:
+            return False
+        if recursos.get("/Font"):
+            return True
+
+        if profundidade >= 3:
+            return False
+        xobjects = recursos.get("/XObject")
+        xobjects = xobjects.get_object() if xobjects is not None else {}
+        for xobject in xobjects.values():
+            xobject = xobject.get_object()
+            if xobject.get("/Subtype") == "/Form" and recursos_tem_fonte(xobject.get("/Resources"), profundidade + 1):
+                return True
+        return False
+    except Exception:
+        return True
+
+
+def pdf_sem_fontes(reader: PdfReader) -> bool:
+    return not any(recursos_tem_fonte(page.get("/Resources")) for page in reader.pages)
+
+
+def extrair_paginas_pdf(file_bytes: bytes) -> Tuple[List[str], bool]:
+    reader = PdfReader(BytesIO(file_bytes))
+
+    # Sem nenhuma fonte nas paginas nao ha texto a extrair (PDF escaneado).
+    if pdf_sem_fontes(reader):
+        return [], True
+
+    return [extrair_texto_pagina(page) for page in reader.pages], False
+
+
+def ProcessaPdfImportado(file_bytes: bytes, hash_conteudo: Optional[str] = None) -> str:
     if not file_bytes:
         return ""
 
-    reader = PdfReader(BytesIO(file_bytes))
+    extracao = obter_cache_extracao().obter_ou_extrair(
+        "pdf", file_bytes, extrair_paginas_pdf, hash_conteudo
+    )
+    if extracao["escaneado"]:
+        return limpar_texto(MENSAGEM_PDF_ESCANEADO)
+
     texts = []
 
-    for i, page in enumerate(reader.pages):
-        page_text = extrair_texto_pagina(page)
+    for i, page_text in enumerate(extracao["paginas"]):
         if page_text:
             texts.append(f"[Pa­gina {i+1}]\n{page_text}")
         else:
@@ -22,11 +70,6 @@ def ProcessaPdfImportado(file_bytes: bytes) -> str:
     full = limpar_texto("\n\n".join(texts))
 
     if extraiEscaneado(full):
-        return limpar_texto(
-            "Nao consegui extrair texto suficiente do PDF. "
-            "Ele parece ser um PDF escaneado (imagem). "
-            "Se você puder, envie o conteudo em .txt, copie/cole o texto do e-mail, "
-            "ou gere um PDF 'pesquisa­vel' (exportado com texto)."
-        )
+        return limpar_texto(MENSAGEM_PDF_ESCANEADO)
 
     return full
@@ -41,6 +41,13 @@ def gerar_resposta_quota_excedida() -> Dict[str, str]:
         "justificativa_curta": "Sistema temporariamente indisponível (alto volume)."
     }
     
+def gerar_resposta_sobrecarga() -> Dict[str, str]:
+    return {
+        "categoria": "Produtivo",
+        "resposta": "Recebemos sua mensagem e retornaremos assim que possível.",
+        "justificativa_curta": "Classificado apenas por regras (sistema em alto volume).",
+    }
+
 def gerar_resposta_mensagem_social(texto_email: str) -> Dict[str, str]:
     texto_normalizado = normalizar_texto(texto_email)
 
@@ -0,0 +1,99 @@
+"""Benchmark de tokens por requisicao em conversas longas (reply chains).
+
+Gera conversas sinteticas de 20 mensagens, cada resposta citando o
+historico inteiro (estilo Gmail com "> " ou estilo Outlook com bloco
+De:/Enviado:/Para:/Assunto:), e compara o prompt completo com o incremental.
+
+Uso: python -m benchmarks.bench_conversas [conversas]
+"""
+import sys
+import time
+
+from app.services.cliente_ia import limitar_texto_para_ia
+from app.services.conversas import EstadoConversas
+from app.services.prompt.prompt import construir_prompt_classificacao
+
+MENSAGENS_POR_CONVERSA = 20
+
+
+def estimar_tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+
+def citar(corpo_anterior: str, numero: int, estilo: str) -> str:
+    if estilo == "outlook":
+        return (
+            "________________________________\n"
+            f"De: Cliente {numero} <cliente{numero}@exemplo>\n"
+            "Enviado: 10/01/2025 09:30\n"
+            "Para: atendimento@exemplo\n"
+            f"Assunto: Contrato {numero}\n\n"
+            f"{corpo_anterior}"
+        )
+    citado = "\n".join(f"> {linha}" for linha in corpo_anterior.split("\n"))
+    return f"Em 10/01/2025, Cliente {numero} escreveu:\n{citado}"
+
+
+def gerar_conversa(numero: int, com_cabecalhos: bool, estilo: str = "gmail"):
+    corpo_anterior = ""
+    for i in range(MENSAGENS_POR_CONVERSA):
+        nova = (
+            f"Mensagem {i} da conversa {numero}. Sobre o contrato {numero}-{i}: "
+            "preciso confirmar o valor da parcela, a data de vencimento e o status do pagamento. "
+            "Segue em anexo o comprovante e a planilha atualizada com os lancamentos do mes. "
+            "Por favor, retornem com a validacao do financeiro assim que possivel."
+        )
+        corpo = nova
+        if corpo_anterior:
+            corpo = f"{nova}\n\n{citar(corpo_anterior, numero, estilo)}"
+
+        texto = corpo
+        if com_cabecalhos:
+            cabecalho = [f"Assunto: {'Re: ' if i else ''}Contrato {numero}", f"Message-ID: <{numero}.{i}@exemplo>"]
+            if i:
+                cabecalho.append(f"In-Reply-To: <{numero}.{i - 1}@exemplo>")
+            texto = "\n".join(cabecalho) + "\n\n" + corpo
+
+        yield texto
+        corpo_anterior = corpo
+
+
+def rodar(total_conversas: int, com_cabecalhos: bool, estilo: str) -> None:
+    estado = EstadoConversas(max_mensagens=total_conversas * MENSAGENS_POR_CONVERSA)
+    tokens_completo = 0
+    tokens_incremental = 0
+    incrementais = 0
+    requisicoes = 0
+    tempo_preparo = 0.0
+
+    for numero in range(total_conversas):
+        for texto in gerar_conversa(numero, com_cabecalhos, estilo):
+            tokens_completo += estimar_tokens(construir_prompt_classificacao(limitar_texto_para_ia(texto)))
+
+            inicio = time.perf_counter()
+            contexto = estado.preparar(texto)
+            tempo_preparo += time.perf_counter() - inicio
+
+            prompt = construir_prompt_classificacao(
+                limitar_texto_para_ia(contexto["texto_para_ia"]), contexto["contexto_conversa"]
+            )
+            tokens_incremental += estimar_tokens(prompt)
+            incrementais += int(contexto["incremental"])
+            requisicoes += 1
+            estado.atualizar(contexto, {"categoria": "Produtivo"})
+
+    print(f"{estilo}, {'com' if com_cabecalhos else 'sem'} cabecalhos ({requisicoes} requisicoes, {incrementais} incrementais)")
+    print(f"  tokens/requisicao completo:    {tokens_completo / requisicoes:.0f}")
+    print(f"  tokens/requisicao incremental: {tokens_incremental / requisicoes:.0f}")
+    print(f"  reducao: {(1 - tokens_incremental / tokens_completo) * 100:.1f}%")
+    print(f"  preparo: {tempo_preparo / requisicoes * 1e6:.0f} us/requisicao")
+
+
+def main(total_conversas: int = 200) -> None:
+    for estilo in ("gmail", "outlook"):
+        rodar(total_conversas, com_cabecalhos=True, estilo=estilo)
+        rodar(total_conversas, com_cabecalhos=False, estilo=estilo)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
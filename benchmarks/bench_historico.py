@@ -0,0 +1,57 @@
+"""Benchmark de ingestao do historico de classificacoes.
+
+Uso: python -m benchmarks.bench_historico [linhas]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from app.services.historico import HistoricoClassificacoes, hash_texto_email
+
+CATEGORIAS = ["Produtivo", "Improdutivo"]
+CAMINHOS = ["ia", "regra_social", "regra_trivial", "regra_spam", "regra_noreply"]
+
+
+def main(total_linhas: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as pasta:
+        historico = HistoricoClassificacoes(
+            caminho_banco=os.path.join(pasta, "bench.db"),
+            tamanho_maximo_fila=total_linhas,
+            tamanho_lote=5000,
+        )
+        hashes = [hash_texto_email(f"email {i}") for i in range(1000)]
+
+        inicio = time.perf_counter()
+        for i in range(total_linhas):
+            historico.registrar({
+                "hash_texto": hashes[i % len(hashes)],
+                "tamanho_texto": 200 + i % 5000,
+                "categoria": CATEGORIAS[i % 2],
+                "caminho": CAMINHOS[i % len(CAMINHOS)],
+                "modelo": "models/gemini-2.5-flash",
+                "versao_prompt": "classificacao-v1",
+                "tempo_total_ms": i % 3000,
+                "tempo_ia_ms": i % 2500,
+            })
+        tempo_enfileirar = time.perf_counter() - inicio
+
+        historico.fechar()
+        tempo_total = time.perf_counter() - inicio
+
+        print(f"linhas: {total_linhas} (gravadas={historico.total_gravados}, descartadas={historico.total_descartados})")
+        print(f"enfileirar: {tempo_enfileirar:.2f}s ({tempo_enfileirar / total_linhas * 1e6:.2f} us/registro)")
+        print(f"ingestao total: {tempo_total:.2f}s ({total_linhas / tempo_total:,.0f} linhas/s)")
+
+        inicio = time.perf_counter()
+        encontrados = historico.consultar_por_hash(hashes[0])
+        print(f"consulta por hash: {(time.perf_counter() - inicio) * 1000:.1f}ms ({len(encontrados)} linhas)")
+
+        agora = time.time()
+        inicio = time.perf_counter()
+        encontrados = historico.consultar_por_periodo(agora - 60, agora, limite=1000)
+        print(f"consulta por periodo: {(time.perf_counter() - inicio) * 1000:.1f}ms ({len(encontrados)} linhas)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
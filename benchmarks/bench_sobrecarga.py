@@ -0,0 +1,90 @@
+"""Teste local de sobrecarga do controle de admissao.
+
+Simula um modelo com capacidade fixa e dobra a carga oferecida (1x, 2x, 4x).
+Goodput = respostas bem-sucedidas dentro do prazo do cliente por segundo.
+
+Roda com os valores padrao do controle (os mesmos do .env.example) e com
+valores ajustados para a latencia do modelo simulado.
+
+Uso: python -m benchmarks.bench_sobrecarga
+"""
+import time
+import threading
+
+from app.services.controle_admissao import ControleAdmissao, SobrecargaError
+
+CAPACIDADE_MODELO = 8
+LATENCIA_MODELO_S = 0.05
+PRAZO_CLIENTE_S = 1.0
+DURACAO_S = 6.0
+
+_modelo = threading.Semaphore(CAPACIDADE_MODELO)
+
+
+def chamar_modelo_simulado() -> None:
+    with _modelo:
+        time.sleep(LATENCIA_MODELO_S)
+
+
+def rodar(taxa_por_s: float, controle: ControleAdmissao = None) -> dict:
+    resultados = {"ok": 0, "atrasadas": 0, "rejeitadas": 0}
+    lock = threading.Lock()
+
+    def requisicao() -> None:
+        inicio = time.monotonic()
+        try:
+            if controle is None:
+                chamar_modelo_simulado()
+            else:
+                with controle.admitir():
+                    chamar_modelo_simulado()
+        except SobrecargaError:
+            with lock:
+                resultados["rejeitadas"] += 1
+            return
+        chave = "ok" if time.monotonic() - inicio <= PRAZO_CLIENTE_S else "atrasadas"
+        with lock:
+            resultados[chave] += 1
+
+    threads = []
+    intervalo = 1.0 / taxa_por_s
+    inicio = time.monotonic()
+    proxima = inicio
+    while proxima - inicio < DURACAO_S:
+        thread = threading.Thread(target=requisicao, daemon=True)
+        thread.start()
+        threads.append(thread)
+        proxima += intervalo
+        time.sleep(max(0.0, proxima - time.monotonic()))
+
+    for thread in threads:
+        thread.join()
+
+    resultados["goodput_por_s"] = round(resultados["ok"] / DURACAO_S, 1)
+    return resultados
+
+
+def main() -> None:
+    capacidade_por_s = CAPACIDADE_MODELO / LATENCIA_MODELO_S
+    print(f"capacidade do modelo: {capacidade_por_s:.0f} req/s, prazo do cliente: {PRAZO_CLIENTE_S}s")
+
+    for fator in (1, 2, 4):
+        taxa = capacidade_por_s * fator
+        sem_controle = rodar(taxa)
+        controle_padrao = ControleAdmissao(max_em_voo=CAPACIDADE_MODELO)
+        com_padrao = rodar(taxa, controle_padrao)
+        controle_ajustado = ControleAdmissao(
+            max_em_voo=CAPACIDADE_MODELO,
+            alvo_ms=20,
+            intervalo_ms=200,
+            espera_maxima_ms=300,
+        )
+        com_ajustado = rodar(taxa, controle_ajustado)
+        print(f"carga {fator}x ({taxa:.0f} req/s)")
+        print(f"  sem controle:          {sem_controle}")
+        print(f"  controle padrao:       {com_padrao}")
+        print(f"  controle ajustado:     {com_ajustado}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+from app.services.conversas import EstadoConversas, separar_historico
+
+AVISO = (
+    "Prezado cliente, informamos que o vencimento da fatura foi alterado para o dia 15. "
+    "Em caso de duvidas, responda este e-mail."
+)
+
+
+def citar_gmail(corpo: str) -> str:
+    citado = "\n".join(f"> {linha}" for linha in corpo.split("\n"))
+    return f"Em 10/01/2025, Banco escreveu:\n{citado}"
+
+
+def citar_outlook(corpo: str) -> str:
+    return (
+        "________________________________\n"
+        "De: Atendimento <atendimento@banco>\n"
+        "Enviado: 10/01/2025 09:30\n"
+        "Para: cliente@exemplo\n"
+        "Assunto: Contrato 77\n\n"
+        f"{corpo}"
+    )
+
+
+def classificar(estado: EstadoConversas, texto: str) -> dict:
+    contexto = estado.preparar(texto)
+    estado.atualizar(contexto, {"categoria": "Produtivo"})
+    return contexto
+
+
+def test_assunto_generico_nao_junta_clientes_diferentes():
+    estado = EstadoConversas()
+    classificar(estado, "Assunto: Re: Duvida\n\nMeu CPF 123.456.789-00, contrato 77, valor 1500. Podem confirmar?")
+
+    contexto_b = estado.preparar("Assunto: Re: Duvida\n\nQual o prazo para a segunda via do boleto?")
+
+    assert contexto_b["incremental"] is False
+    assert "123.456.789-00" not in contexto_b["contexto_conversa"]
+
+
+def test_respostas_ao_mesmo_aviso_sem_cabecalhos_nao_se_misturam():
+    estado = EstadoConversas()
+    classificar(estado, f"Ja paguei, CPF 123.456.789-00, conta 4455 do Joao.\n\n{citar_gmail(AVISO)}")
+
+    contexto_b = estado.preparar(f"Assunto: Re: Aviso\n\nPosso pagar no dia 20?\n\n{citar_gmail(AVISO)}")
+
+    assert contexto_b["incremental"] is False
+    assert "123.456.789-00" not in contexto_b["contexto_conversa"]
+
+
+def test_respostas_ao_mesmo_aviso_com_in_reply_to_nao_se_misturam():
+    estado = EstadoConversas()
+    classificar(
+        estado,
+        "Assunto: Re: Aviso\nMessage-ID: <a@cliente>\nIn-Reply-To: <aviso-123@banco>\n\n"
+        "Ja paguei, CPF 123.456.789-00, conta 4455 do Joao.",
+    )
+
+    contexto_b = estado.preparar(
+        "Assunto: Re: Aviso\nMessage-ID: <b@cliente>\nIn-Reply-To: <aviso-123@banco>\n\nPosso pagar no dia 20?"
+    )
+
+    assert contexto_b["incremental"] is False
+    assert "123.456.789-00" not in contexto_b["contexto_conversa"]
+
+
+def test_aviso_classificado_nao_repassa_resposta_de_outro_cliente():
+    estado = EstadoConversas()
+    classificar(estado, f"Message-ID: <aviso-123@banco>\n\n{AVISO}")
+    classificar(
+        estado,
+        "In-Reply-To: <aviso-123@banco>\n\nJa paguei, CPF 123.456.789-00, conta 4455 do Joao.",
+    )
+
+    contexto_b = estado.preparar("In-Reply-To: <aviso-123@banco>\n\nPosso pagar no dia 20?")
+
+    assert contexto_b["incremental"] is True
+    assert "vencimento da fatura" in contexto_b["contexto_conversa"]
+    assert "123.456.789-00" not in contexto_b["contexto_conversa"]
+
+
+def test_resposta_por_in_reply_to_e_incremental():
+    estado = EstadoConversas()
+    classificar(estado, "Assunto: Contrato 77\nMessage-ID: <1@cliente>\n\nPreciso da segunda via do contrato 77.")
+
+    contexto = estado.preparar(
+        "Assunto: Re: Contrato 77\nIn-Reply-To: <1@cliente>\n\nConseguiram enviar?"
+    )
+
+    assert contexto["incremental"] is True
+    assert contexto["texto_para_ia"] == "Conseguiram enviar?"
+    assert "segunda via do contrato 77" in contexto["contexto_conversa"]
+
+
+def test_resposta_citada_estilo_gmail_e_incremental():
+    estado = EstadoConversas()
+    primeira = "Preciso da segunda via do contrato 77, por favor."
+    classificar(estado, primeira)
+
+    contexto = estado.preparar(f"Conseguiram enviar?\n\n{citar_gmail(primeira)}")
+
+    assert contexto["incremental"] is True
+    assert contexto["texto_para_ia"] == "Conseguiram enviar?"
+
+
+def test_resposta_citada_estilo_outlook_e_incremental():
+    estado = EstadoConversas()
+    primeira = "Preciso da segunda via do contrato 77, por favor.\nObrigado."
+    classificar(estado, primeira)
+
+    contexto = estado.preparar(f"Conseguiram enviar?\n\n{citar_outlook(primeira)}")
+
+    assert contexto["incremental"] is True
+    assert contexto["texto_para_ia"] == "Conseguiram enviar?"
+
+
+def test_separar_historico_outlook():
+    nova, historico = separar_historico(f"Conseguiram enviar?\n\n{citar_outlook('Texto anterior.')}")
+
+    assert nova == "Conseguiram enviar?"
+    assert historico.startswith("____")
+    assert "Texto anterior." in historico
+
+
+def test_primeiro_resumo_inclui_historico_citado():
+    estado = EstadoConversas()
+    primeira = "Mensagem um: preciso do contrato 77."
+    segunda = f"Mensagem dois: alguma novidade?\n\n{citar_gmail(primeira)}"
+    terceira = f"Mensagem tres: ainda aguardo.\n\n{citar_gmail(segunda)}"
+
+    classificar(estado, terceira)
+    contexto = estado.preparar(f"Mensagem quatro: urgente.\n\n{citar_gmail(terceira)}")
+
+    assert contexto["incremental"] is True
+    for trecho in ("Mensagem um", "Mensagem dois", "Mensagem tres"):
+        assert trecho in contexto["contexto_conversa"]
+
+
+def test_estado_limitado():
+    estado = EstadoConversas(max_mensagens=3)
+    for numero in range(10):
+        classificar(estado, f"Message-ID: <{numero}@cliente>\n\nPedido numero {numero} sobre o contrato.")
+
+    estatisticas = estado.estatisticas()
+    assert estatisticas["mensagens"] == 3
+    assert estatisticas["apelidos"] <= estado.max_apelidos
+    assert estado.preparar("In-Reply-To: <0@cliente>\n\nE entao?")["incremental"] is False
+    assert estado.preparar("In-Reply-To: <9@cliente>\n\nE entao?")["incremental"] is True